@@ -1,6 +1,7 @@
 import os
 import re
 from collections import defaultdict
+from llm_cache import cached_complete
 
 # 🔧 전처리: 파일명을 토큰 단위로 분석 가능하게 정제
 def preprocess_filename(name):
@@ -11,46 +12,68 @@ def preprocess_filename(name):
     name = re.sub(r'\s+', ' ', name).strip().lower()
     return name
 
-# 🔍 유사도: 자카드 유사도로 유사한 토큰 기반 비교
-def jaccard_similarity(a, b):
-    set_a = set(preprocess_filename(a).split())
-    set_b = set(preprocess_filename(b).split())
-    return len(set_a & set_b) / len(set_a | set_b) if set_a | set_b else 0.0
+# 🔍 유사도: 미리 만든 토큰 집합끼리 자카드 유사도 비교
+def jaccard_similarity(set_a, set_b):
+    union = set_a | set_b
+    return len(set_a & set_b) / len(union) if union else 0.0
 
 # 🔧 그룹핑: 전처리 + 자카드 기반 그룹핑
-def group_similar_filenames(file_paths, threshold=0.5):
-    filenames = [os.path.basename(path) for path in file_paths]
-    groups = []
-    assigned = [False] * len(filenames)
-
-    for i, fname in enumerate(filenames):
-        if assigned[i]:
-            continue
-        group = [file_paths[i]]
-        assigned[i] = True
-        for j in range(i + 1, len(filenames)):
-            if not assigned[j]:
-                score = jaccard_similarity(fname, filenames[j])
-                if score >= threshold:
-                    group.append(file_paths[j])
-                    assigned[j] = True
-        groups.append(group)
-
-    return groups
+# 토큰 → 파일 역색인으로 토큰을 공유하는 후보끼리만 비교 (공유 토큰이 없으면 유사도 0)
+# 유사한 쌍은 union-find 로 묶어 A~B, B~C 이면 A, B, C 가 한 그룹이 되도록 한다
+def group_similar_filenames(file_paths, threshold=0.5, filenames=None):
+    # 호출 측에서 이미 구한 basename 목록(file_paths 와 같은 순서)을 넘기면 다시 계산하지 않는다
+    if filenames is None:
+        filenames = [os.path.basename(path) for path in file_paths]
+    token_sets = [set(preprocess_filename(name).split()) for name in filenames]
+    token_index = defaultdict(list)
+    for i, tokens in enumerate(token_sets):
+        for token in tokens:
+            token_index[token].append(i)
+
+    parent = list(range(len(filenames)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, tokens in enumerate(token_sets):
+        candidates = {j for token in tokens for j in token_index[token] if j > i}
+        for j in candidates:
+            root_i, root_j = find(i), find(j)
+            if root_i == root_j:
+                continue
+            if jaccard_similarity(tokens, token_sets[j]) >= threshold:
+                parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    groups = defaultdict(list)
+    for i, path in enumerate(file_paths):
+        groups[find(i)].append(path)
+    return list(groups.values())
 
 # 🔍 폴더명 정제
+# 응답 앞머리 제거 패턴 — 기존과 같은 순서로 각각 한 번씩 적용
+_PAT_LEAD = (
+    re.compile(r"^\ud310\ub2e8[:：]?\s*"),
+    re.compile(r"^\ub2f5\ubcc0[:：]?\s*"),
+    re.compile(r"^\ud83d\udcc2.*?\\.docx\"\s*"),
+    re.compile(r"^\ud30c일 \uc774\ub984[:：]?\s*"),
+    re.compile(r"^\ucd9c\ub825[:：]?\s*"),
+    re.compile(r"^\uc608시 \ucd9c\ub825[:：]?\s*"),
+)
+_PAT_QUOTES = re.compile(r'[\"\u201c\u201d\u2018\u2019]')
+_PAT_FSCHARS = re.compile(r'[\\/:*?"<>|]')
+_PAT_HANGUL = re.compile(r'[\uac00-\ud7a3]')
+
 def clean_category(raw_text):
     line = raw_text.strip().split("\n")[0]
-    line = re.sub(r"^\ud310\ub2e8[:：]?\s*", "", line)
-    line = re.sub(r"^\ub2f5\ubcc0[:：]?\s*", "", line)
-    line = re.sub(r"^\ud83d\udcc2.*?\\.docx\"\s*", "", line)
-    line = re.sub(r"^\ud30c일 \uc774\ub984[:：]?\s*", "", line)
-    line = re.sub(r"^\ucd9c\ub825[:：]?\s*", "", line)
-    line = re.sub(r"^\uc608시 \ucd9c\ub825[:：]?\s*", "", line)
-    line = re.sub(r'[\"\u201c\u201d\u2018\u2019]', '', line)
-    line = re.sub(r'[\\/:*?"<>|]', '', line)
-
-    if not re.search(r'[\uac00-\ud7a3]', line):
+    for pattern in _PAT_LEAD:
+        line = pattern.sub("", line)
+    line = _PAT_QUOTES.sub('', line)
+    line = _PAT_FSCHARS.sub('', line)
+
+    if not _PAT_HANGUL.search(line):
         return None
     if not line or line.lower() in ["\uae30\ud0c0", "\uc54c \uc218 \uc5c6음", "\ubaa8른", "unknown"] or len(line.strip()) < 2:
         return None
@@ -82,17 +105,11 @@ def extract_examples_from_log(log_file_path, max_per_category=3):
     return formatted_examples
 
 # 🎞 그룹 단위로 AI 호출에서 분류 실행
-def classify_by_filename_grouped(file_paths, model, silent=False, log_file=None):
-    results = []
-    grouped_files = group_similar_filenames(file_paths, threshold=0.5)
-
-    for group in grouped_files:
-        filenames = [os.path.basename(p) for p in group]
-
-        prompt = f"""
-다음은 유사한 파일 이름들의 목록입니다:
-{chr(10).join(f'- {name}' for name in filenames)}
-
+# 고정된 지시문을 항상 같은 바이트로 앞에 두고, 바뀌는 파일 목록은 그 뒤에 둔다
+# (llama.cpp 가 직전 호출과 공통인 앞부분의 KV 캐시를 재사용할 수 있도록)
+# 끝에는 고정된 답변 유도 문구를 붙여 모델이 목록을 이어 쓰지 않고 폴더명을 출력하게 한다
+GROUP_PROMPT_HEADER = """
+아래 목록은 유사한 파일 이름들입니다.
 이 파일들의 공통 주제를 대표하는 **짧고 명확한 한국어 폴더명**을 한 줄로 출력하세요.
 
 조건:
@@ -100,27 +117,50 @@ def classify_by_filename_grouped(file_paths, model, silent=False, log_file=None)
 - 설명하지 마세요. 예시는 금지.
 - "기타", "모름", "출력" 같은 일반 단어는 사용하지 마세요.
 - 출력은 오직 **한 줄**, 폴더명만!
+
+파일 이름 목록:
 """
+GROUP_PROMPT_SUFFIX = "\n폴더명:"
+
+def build_group_prompt(filenames):
+    return GROUP_PROMPT_HEADER + '\n'.join(f'- {name}' for name in filenames) + '\n' + GROUP_PROMPT_SUFFIX
+
+def classify_by_filename_grouped(file_paths, model, silent=False, log_fp=None):
+    results = []
+    filenames = list(map(os.path.basename, file_paths))
+    grouped_files = group_similar_filenames(file_paths, threshold=0.5, filenames=filenames)
+    basenames = dict(zip(file_paths, filenames))
+    prompts = [build_group_prompt([basenames[p] for p in group]) for group in grouped_files]
+
+    def request_category(prompt):
         try:
-            response = model.create_completion(prompt)
+            response = cached_complete(model, prompt)
             raw_text = response["choices"][0]["text"]
-            category = clean_category(raw_text)
+            return clean_category(raw_text)
         except Exception as e:
             if not silent:
                 print(f"❌ 오류 (LLM 응답 실패): {e}")
-            category = None
+            return None
+
+    # 프로세스 내 llama.cpp 모델은 스레드 안전하지 않으므로 그룹 프롬프트는 순서대로 하나씩 처리
+    categories = [request_category(prompt) for prompt in prompts]
 
+    for group, category in zip(grouped_files, categories):
+        log_lines = []
         for path in group:
             results.append({
                 "file_path": path,
                 "foldername": category
             })
 
-            if silent and log_file:
-                with open(log_file, 'a', encoding='utf-8') as f:
-                    f.write(f"[파일명 그룹 분류] {os.path.basename(path)} -> {category if category else '분류 실패'}\n")
+            if silent and log_fp:
+                log_lines.append(f"[파일명 그룹 분류] {basenames[path]} -> {category if category else '분류 실패'}\n")
             elif not silent:
-                print(f"[파일명 그룹 분류] {os.path.basename(path)} → {category if category else '❌ 실패'}")
+                print(f"[파일명 그룹 분류] {basenames[path]} → {category if category else '❌ 실패'}")
+
+        # 그룹 단위로 한 번에 기록 (응답 수집 후 메인 스레드에서만 기록하므로 별도 잠금 불필요)
+        if log_lines:
+            log_fp.writelines(log_lines)
 
     return results
 def remove_duplicate_examples(example_lines, max_examples=50):
@@ -135,11 +175,10 @@ def remove_duplicate_examples(example_lines, max_examples=50):
     return deduped
 
 # 📆 전체 일감 분류 방식
-def classify_filenames_bulk(file_paths, model, silent=False, log_file=None, extra_examples=None):
+def classify_filenames_bulk(file_paths, model, silent=False, log_fp=None, extra_examples=None):
+    """예시는 호출 측에서 extract_examples_from_log 로 읽어 extra_examples 로 전달"""
     filenames = [os.path.basename(p) for p in file_paths]
-    example_lines = extract_examples_from_log(log_file) if log_file else []
-    if extra_examples:
-        example_lines.extend(extra_examples)
+    example_lines = list(extra_examples) if extra_examples else []
     example_lines = remove_duplicate_examples(example_lines, max_examples=50)
     example_text = '\n'.join(example_lines)
 
@@ -167,7 +206,7 @@ def classify_filenames_bulk(file_paths, model, silent=False, log_file=None, extr
 """
 
     try:
-        response = model.create_completion(prompt)
+        response = cached_complete(model, prompt)
         text = response["choices"][0]["text"].strip()
     except Exception as e:
         print(f"❌ AI 응답 오류: {e}")
@@ -190,8 +229,7 @@ def classify_filenames_bulk(file_paths, model, silent=False, log_file=None, extr
         })
         if not silent:
             print(f"[AI 분류] {name} → {foldername if foldername else '❌ 실패'}")
-        elif silent and log_file:
-            with open(log_file, 'a', encoding='utf-8') as f:
-                f.write(f"[AI 분류] {name} → {foldername if foldername else '실패'}\n")
+        elif silent and log_fp:
+            log_fp.write(f"[AI 분류] {name} → {foldername if foldername else '실패'}\n")
 
     return results
@@ -2,6 +2,7 @@ import os
 import shutil
 import re
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from rich.progress import Progress, TextColumn, BarColumn, TimeElapsedColumn
 
 def sanitize_filename(name, max_length=50, max_words=5):
@@ -80,8 +81,8 @@ def compute_operations(data_list, output_path, renamed_files, processed_files, p
         new_file_path = os.path.join(dir_path, new_file_name)
 
         counter = 1
+        name, ext = os.path.splitext(new_file_name)
         while new_file_path in renamed_files:
-            name, ext = os.path.splitext(new_file_name)
             new_file_path = os.path.join(dir_path, f"{name}_{counter}{ext}")
             counter += 1
 
@@ -97,9 +98,25 @@ def compute_operations(data_list, output_path, renamed_files, processed_files, p
 
     return operations
 
-def execute_operations(operations, dry_run=False, silent=False, log_file=None):
-    """Move files according to the operations."""
+def move_file(src, dst, dry_run=False):
+    """Move a single file and return the log message."""
+    try:
+        if not dry_run:
+            shutil.move(src, dst)
+        return f"Moved file from '{src}' to '{dst}'"
+    except Exception as e:
+        return f"Error moving file from '{src}' to '{dst}': {e}"
+
+def execute_operations(operations, dry_run=False, silent=False, log_fp=None, max_workers=None):
+    """Move files according to the operations, running the moves in a thread pool."""
     total = len(operations)
+    if max_workers is None:
+        max_workers = (os.cpu_count() or 1) * 4
+
+    # Create each destination directory once before dispatching the moves
+    for dir_path in {os.path.dirname(op['destination']) for op in operations}:
+        os.makedirs(dir_path, exist_ok=True)
+
     with Progress(
         TextColumn("[progress.description]{task.description}"),
         BarColumn(),
@@ -107,19 +124,12 @@ def execute_operations(operations, dry_run=False, silent=False, log_file=None):
         transient=True
     ) as progress:
         task = progress.add_task("Organizing Files...", total=total)
-        for op in operations:
-            src = op['source']
-            dst = op['destination']
-            os.makedirs(os.path.dirname(dst), exist_ok=True)
-            try:
-                if not dry_run:
-                    shutil.move(src, dst)
-                msg = f"Moved file from '{src}' to '{dst}'"
-            except Exception as e:
-                msg = f"Error moving file from '{src}' to '{dst}': {e}"
-            if not silent:
-                print(msg)
-            elif log_file:
-                with open(log_file, 'a', encoding='utf-8') as f:
-                    f.write(msg + '\n')
-            progress.advance(task)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(move_file, op['source'], op['destination'], dry_run) for op in operations]
+            for future in futures:
+                msg = future.result()
+                if not silent:
+                    print(msg)
+                elif log_fp:
+                    log_fp.write(msg + '\n')
+                progress.advance(task)
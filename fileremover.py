@@ -57,16 +57,6 @@ def extract_docx_text(path):
     except:
         return ""
 
-# ✅ 텍스트 유사도 비교 함수 (.docx 전용)
-def is_content_similar(file1, file2, threshold=0.85):
-    try:
-        text1 = extract_docx_text(file1)
-        text2 = extract_docx_text(file2)
-        similarity = difflib.SequenceMatcher(None, text1, text2).ratio()
-        return similarity >= threshold
-    except:
-        return False
-
 # ✅ 유사도 기반 파일 클러스터 구성 함수
 def build_similarity_clusters(similarity_groups):
     visited = set()
@@ -131,11 +121,21 @@ def isolate_all(directory):
         if len(files) <= 1:
             continue
         similarity_graph = defaultdict(set)
-        for i in range(len(files)):
-            for j in range(i + 1, len(files)):
-                if is_content_similar(files[i], files[j]):
-                    similarity_graph[files[i]].add(files[j])
-                    similarity_graph[files[j]].add(files[i])
+        texts = [extract_docx_text(f) for f in files]
+        threshold = 0.85
+        for j in range(1, len(files)):
+            # b(= texts[j]) 쪽 색인은 한 번만 만들고, a 만 set_seq1 로 바꿔가며 재사용
+            # (기존과 같이 SequenceMatcher(a=files[i], b=files[j]) 순서 유지 — ratio 는 대칭이 아님)
+            matcher = difflib.SequenceMatcher(None, None, texts[j])
+            for i in range(j):
+                if texts[i] != texts[j]:
+                    matcher.set_seq1(texts[i])
+                    # 상한값(real_quick_ratio, quick_ratio)이 기준 미만이면 전체 ratio 계산 생략
+                    if (matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold
+                            or matcher.ratio() < threshold):
+                        continue
+                similarity_graph[files[i]].add(files[j])
+                similarity_graph[files[j]].add(files[i])
 
         # 🧩 유사도가 연결되지 않은 단독 파일도 포함되도록 보완
         all_related = set()
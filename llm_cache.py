@@ -0,0 +1,138 @@
+import os
+import json
+import hashlib
+import threading
+from diskcache import Cache
+
+# ✅ LLM 응답 캐시 경로 (실행이 바뀌어도 유지되는 디스크 캐시)
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "fileindex")
+
+# ✅ 의미 기반 캐시 설정 (요약이 거의 같으면 이전 응답 재사용)
+SEMANTIC_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+SEMANTIC_THRESHOLD = 0.92
+
+_cache = None
+
+# 하나의 llama.cpp 컨텍스트를 감싸는 NexaTextInference 는 스레드 안전하지 않으므로 모델 호출은 항상 하나씩
+_model_lock = threading.Lock()
+
+def get_cache():
+    """디스크 캐시를 처음 사용할 때 연다."""
+    global _cache
+    if _cache is None:
+        _cache = Cache(CACHE_DIR)
+    return _cache
+
+def _model_id(model):
+    return getattr(model, 'downloaded_path', None) or getattr(model, 'model_path', None) or type(model).__name__
+
+def _model_params(model):
+    return getattr(model, 'params', None) or {}
+
+def _model_temperature(model):
+    return _model_params(model).get('temperature', 0.0)
+
+# 🔑 캐시 키: 모델 + 프롬프트 + 생성 파라미터 전체(temperature, max_new_tokens, top_k, top_p, stop_words ...)의 sha256
+def make_cache_key(model_id, prompt, params):
+    payload = json.dumps({"model": model_id, "prompt": prompt, "params": params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def _create_completion(model, prompt):
+    with _model_lock:
+        return model.create_completion(prompt)
+
+def cached_complete(model, prompt):
+    """model.create_completion 과 같은 응답을 반환하되, 같은 프롬프트는 캐시에서 꺼낸다.
+    temperature > 0 이면 결과가 매번 달라야 하므로 캐시를 사용하지 않는다."""
+    if _model_temperature(model) > 0:
+        return _create_completion(model, prompt)
+
+    cache = get_cache()
+    key = make_cache_key(_model_id(model), prompt, _model_params(model))
+    response = cache.get(key)
+    if response is None:
+        response = _create_completion(model, prompt)
+        cache.set(key, response)
+    return response
+
+# 🗂 파일 단위 메타데이터 캐시: (경로, 수정시각, 크기)가 같으면 이전 결과 재사용
+# version 에는 호출 측의 프롬프트/파싱 로직 해시를 넘겨, 로직이 바뀌면 이전 결과가 자동으로 무시되게 한다
+def _file_metadata_key(model, file_path, version):
+    st = os.stat(file_path)
+    params = json.dumps(_model_params(model), sort_keys=True, default=str)
+    return ("file-metadata", version, _model_id(model), params, os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+
+def get_file_metadata(model, file_path, version):
+    """변경되지 않은 파일의 이전 (foldername, filename, description) 을 반환, 없으면 None"""
+    if _model_temperature(model) > 0:
+        return None
+    try:
+        return get_cache().get(_file_metadata_key(model, file_path, version))
+    except OSError:
+        return None
+
+def set_file_metadata(model, file_path, version, metadata):
+    if _model_temperature(model) > 0:
+        return
+    try:
+        get_cache().set(_file_metadata_key(model, file_path, version), metadata)
+    except OSError:
+        pass
+
+# 🧠 의미 기반 캐시: 임베딩 모델과 FAISS 인덱스는 처음 사용할 때 로드
+# sentence-transformers / faiss-cpu 는 선택 설치 — 로드/임포트에 실패하면(미설치, 오프라인에서 모델 다운로드 불가 등)
+# 이번 실행 동안 의미 기반 캐시를 끄고 일반 캐시만 사용
+_encoder = None
+_semantic_index = None
+_semantic_responses = []
+_semantic_disabled = False
+_semantic_error = None
+_semantic_lock = threading.Lock()
+
+def _embed(text):
+    global _encoder
+    if _encoder is None:
+        from sentence_transformers import SentenceTransformer
+        _encoder = SentenceTransformer(SEMANTIC_MODEL_NAME, device="cpu")
+    return _encoder.encode([text], normalize_embeddings=True).astype('float32')
+
+def _disable_semantic_cache(error):
+    global _semantic_disabled, _semantic_error
+    _semantic_disabled = True
+    _semantic_error = error
+
+def semantic_cache_error():
+    """의미 기반 캐시가 꺼진 이유(예외)를 반환, 정상이면 None. 출력은 호출 측이 silent/log 설정에 맞게 한다."""
+    return _semantic_error
+
+def semantic_lookup(model, key_text, threshold=SEMANTIC_THRESHOLD):
+    """key_text 와 코사인 유사도가 threshold 이상인 이전 응답을 찾는다 (정규화 임베딩의 내적 = 코사인 유사도).
+    (응답 또는 None, 임베딩 벡터 또는 None) 을 반환하며, 벡터는 미스 후 semantic_add 에 넘긴다."""
+    if _semantic_disabled or _model_temperature(model) > 0 or not key_text:
+        return None, None
+    with _semantic_lock:
+        try:
+            vector = _embed(key_text)
+        except Exception as e:
+            _disable_semantic_cache(e)
+            return None, None
+        if _semantic_index is not None and _semantic_index.ntotal:
+            scores, ids = _semantic_index.search(vector, 1)
+            if scores[0][0] >= threshold:
+                return _semantic_responses[ids[0][0]], vector
+    return None, vector
+
+def semantic_add(vector, response):
+    global _semantic_index
+    if vector is None or _semantic_disabled:
+        return
+    with _semantic_lock:
+        if _semantic_index is None:
+            try:
+                import faiss
+            except ImportError as e:
+                _disable_semantic_cache(e)
+                return
+            _semantic_index = faiss.IndexFlatIP(vector.shape[1])
+        _semantic_index.add(vector)
+        _semantic_responses.append(response)
@@ -1,7 +1,7 @@
 import os
 import time
 import re
-from difflib import get_close_matches
+from rapidfuzz import process, fuzz
 from datetime import datetime
 from file_utils import collect_file_paths, read_file_data
 from data_processing_common import compute_operations, execute_operations
@@ -17,17 +17,11 @@ def normalize_korean_foldername(text):
 def normalize_foldername(foldername, existing_names, threshold=0.65):
     simplified_input = normalize_korean_foldername(foldername)
     simplified_existing = {name: normalize_korean_foldername(name) for name in existing_names}
-    for orig_name, simplified in simplified_existing.items():
-        if get_close_matches(simplified_input, [simplified], n=1, cutoff=threshold):
-            return orig_name
+    match = process.extractOne(simplified_input, simplified_existing, scorer=fuzz.ratio, score_cutoff=threshold * 100)
+    if match:
+        return match[2]
     return foldername
 
-def ensure_nltk_data():
-    import nltk
-    nltk.download('stopwords', quiet=True)
-    nltk.download('punkt', quiet=True)
-    nltk.download('wordnet', quiet=True)
-
 def simulate_directory_tree(operations, base_path):
     tree = {}
     for op in operations:
@@ -77,7 +71,6 @@ def initialize_models():
         print("**----------------------------------------------**")
 
 def main(auto_mode=False):
-    ensure_nltk_data()
     print("-" * 50)
     print("**NOTE: Silent mode logs all outputs to a text file instead of displaying them in the terminal.")
     silent_mode = True
@@ -108,63 +101,65 @@ def main(auto_mode=False):
     examples = extract_examples_from_log(log_file)
     examples = remove_duplicate_examples(examples, max_examples=50)
 
-    filename_classified = classify_filenames_bulk(file_paths, text_inference, silent=silent_mode, log_file=log_file, extra_examples=examples)
-
-    text_files_for_content = []
-    for item in filename_classified:
-        if item["foldername"] is None:
-            text_content = read_file_data(item["file_path"])
-            if text_content:
-                text_files_for_content.append((item["file_path"], text_content))
-
-    content_classified = process_text_files(text_files_for_content, text_inference, silent=silent_mode, log_file=log_file)
-
-    final_classification = []
-    existing_names = set()
-    for item in filename_classified:
-        base_foldername = item["foldername"]
-        if not base_foldername:
-            matched = next((c for c in content_classified if c["file_path"] == item["file_path"]), None)
-            if matched:
-                base_foldername = matched["foldername"]
-
-        if base_foldername:
-            base_foldername = normalize_foldername(base_foldername, existing_names)
-            existing_names.add(base_foldername)
-            quarter_path = get_quarter_path(item["file_path"])
-            full_folder_path = os.path.join(quarter_path, base_foldername)
-            final_classification.append({
-                "file_path": item["file_path"],
-                "foldername": full_folder_path
-            })
-
-    operations = compute_operations(
-        final_classification,
-        output_path,
-        renamed_files=set(),
-        processed_files=set(),
-        preserve_filename=True
-    )
-
-    # ✅ 분류 완료 후, 삭제 후보 정리!
-    print("Processing delete candidates (duplicate and old versions)...")
-    process_delete_candidates(input_path)
-    print("Delete candidate processing completed.")
-    print("-" * 50)
-
-    print("Proposed directory structure:")
-    print(os.path.abspath(output_path))
-    simulated_tree = simulate_directory_tree(operations, output_path)
-    print_simulated_tree(simulated_tree)
-    print("-" * 50)
-
-    os.makedirs(output_path, exist_ok=True)
-    execute_operations(
-        operations,
-        dry_run=False,
-        silent=silent_mode,
-        log_file=log_file
-    )
+    # 로그 파일은 한 번만 열고 모든 단계에서 같은 핸들에 기록
+    with open(log_file, 'a', encoding='utf-8', buffering=1 << 16) as log_fp:
+        filename_classified = classify_filenames_bulk(file_paths, text_inference, silent=silent_mode, log_fp=log_fp, extra_examples=examples)
+
+        text_files_for_content = []
+        for item in filename_classified:
+            if item["foldername"] is None:
+                text_content = read_file_data(item["file_path"])
+                if text_content:
+                    text_files_for_content.append((item["file_path"], text_content))
+
+        content_classified = process_text_files(text_files_for_content, text_inference, silent=silent_mode, log_fp=log_fp)
+
+        final_classification = []
+        existing_names = set()
+        for item in filename_classified:
+            base_foldername = item["foldername"]
+            if not base_foldername:
+                matched = next((c for c in content_classified if c["file_path"] == item["file_path"]), None)
+                if matched:
+                    base_foldername = matched["foldername"]
+
+            if base_foldername:
+                base_foldername = normalize_foldername(base_foldername, existing_names)
+                existing_names.add(base_foldername)
+                quarter_path = get_quarter_path(item["file_path"])
+                full_folder_path = os.path.join(quarter_path, base_foldername)
+                final_classification.append({
+                    "file_path": item["file_path"],
+                    "foldername": full_folder_path
+                })
+
+        operations = compute_operations(
+            final_classification,
+            output_path,
+            renamed_files=set(),
+            processed_files=set(),
+            preserve_filename=True
+        )
+
+        # ✅ 분류 완료 후, 삭제 후보 정리!
+        print("Processing delete candidates (duplicate and old versions)...")
+        process_delete_candidates(input_path)
+        print("Delete candidate processing completed.")
+        print("-" * 50)
+
+        print("Proposed directory structure:")
+        print(os.path.abspath(output_path))
+        simulated_tree = simulate_directory_tree(operations, output_path)
+        print_simulated_tree(simulated_tree)
+        print("-" * 50)
+
+        os.makedirs(output_path, exist_ok=True)
+        execute_operations(
+            operations,
+            dry_run=False,
+            silent=silent_mode,
+            log_fp=log_fp
+        )
 
     print("-" * 50)
     print("The files have been organized successfully.")
@@ -1,18 +1,11 @@
 import re
 import os
 import time
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.probability import FreqDist
-from nltk.stem import WordNetLemmatizer
+import json
+import hashlib
 from rich.progress import Progress, TextColumn, BarColumn, TimeElapsedColumn
 from data_processing_common import sanitize_filename
-
-# 필요한 nltk 리소스 다운로드
-nltk.download('punkt', quiet=True)
-nltk.download('stopwords', quiet=True)
-nltk.download('wordnet', quiet=True)
+from llm_cache import cached_complete, semantic_lookup, semantic_add, semantic_cache_error, get_file_metadata, set_file_metadata
 
 # ✅ 제목/첫 문단만 추출
 
@@ -20,91 +13,158 @@ def extract_title_or_intro(text):
     lines = [line.strip() for line in text.strip().split('\n') if line.strip()]
     return '\n'.join(lines[:2]) if lines else ''
 
-def summarize_text_content(text, text_inference):
-    """요약: 텍스트 내용을 간결하게 요약"""
-    max_chars = 1500
-    text = text[:max_chars]
-    prompt = f"""
+SUMMARY_PROMPT_HEADER = """
 다음 글의 주제를 요약해 주세요. 최대 2문장 이내로 간단히 작성해주세요.
 
 내용:
-{text}
+"""
+
+def build_summary_prompt(text):
+    max_chars = 1500
+    text = text[:max_chars]
+    return SUMMARY_PROMPT_HEADER + f"""{text}
 
 요약:
 """
-    response = text_inference.create_completion(prompt)
-    return response['choices'][0]['text'].strip()
 
-def process_single_text_file(args, text_inference, silent=False, log_file=None):
-    file_path, text = args
+def process_text_files(text_tuples, text_inference, silent=False, log_fp=None):
+    """모든 파일의 요약을 먼저 만들고, 이어서 파일명 + 폴더명을 만든다 (같은 종류의 프롬프트가 연속되도록).
+    내용이 바뀌지 않은 파일(경로, 수정시각, 크기 동일)은 이전 결과를 재사용"""
+    metadata = {}
+    for file_path, _ in text_tuples:
+        cached = get_file_metadata(text_inference, file_path, METADATA_CACHE_VERSION)
+        if cached is not None:
+            metadata[file_path] = cached
+    pending = [(file_path, text) for file_path, text in text_tuples if file_path not in metadata]
+
     start_time = time.time()
-    with Progress(
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TimeElapsedColumn()
-    ) as progress:
-        task_id = progress.add_task(f"Processing {os.path.basename(file_path)}", total=1.0)
-        foldername, filename, description = generate_text_metadata(text, file_path, progress, task_id, text_inference)
-    end_time = time.time()
-    message = f"File: {file_path}\nTime taken: {end_time - start_time:.2f} seconds\nDescription: {description}\nFolder name: {foldername}\nGenerated filename: {filename}\n"
-    if silent and log_file:
-        with open(log_file, 'a', encoding='utf-8') as f:
-            f.write(message + '\n')
+    if pending:
+        filenames_ko = [os.path.splitext(os.path.basename(file_path))[0] for file_path, _ in pending]
+        with Progress(
+            TextColumn("[progress.description]{task.description}"),
+            BarColumn(),
+            TimeElapsedColumn()
+        ) as progress:
+            task_id = progress.add_task(f"Processing {len(pending)} text files", total=2)
+
+            # Step 1: 요약 일괄 생성
+            summary_prompts = [build_summary_prompt(extract_title_or_intro(text)) for _, text in pending]
+            descriptions = [cached_complete(text_inference, prompt)['choices'][0]['text'].strip() for prompt in summary_prompts]
+            progress.update(task_id, advance=1)
+
+            # Step 2: 파일명 + 폴더명 생성
+            # 같은 배치 안의 유사 문서도 의미 기반 캐시에 맞도록 한 파일씩 조회 → 미스면 생성 후 바로 추가
+            generated = []
+            for name, desc in zip(filenames_ko, descriptions):
+                hit, vector = semantic_lookup(text_inference, f"{name}\n{desc}")
+                if hit is not None:
+                    # 유사 문서에서는 폴더명만 가져오고, 파일명은 이 파일의 원래 이름을 쓴다
+                    foldername, _ = extract_metadata(hit['choices'][0]['text'], name)
+                    generated.append((foldername, name, True))
+                else:
+                    response = cached_complete(text_inference, build_metadata_prompt(name, desc))
+                    semantic_add(vector, response)
+                    generated.append(extract_metadata(response['choices'][0]['text'], name) + (False,))
+            progress.update(task_id, advance=1)
+
+        for (file_path, _), (foldername, filename, from_semantic_hit), description in zip(pending, generated, descriptions):
+            metadata[file_path] = (foldername, filename, description)
+            # 폴더명을 얻지 못한 결과('기타')와 유사 문서에서 빌려온 결과는 저장하지 않아 다음 실행에서 다시 생성
+            if foldername != '기타' and not from_semantic_hit:
+                set_file_metadata(text_inference, file_path, METADATA_CACHE_VERSION, metadata[file_path])
+    elapsed = time.time() - start_time
+
+    summary = f"Text files: {len(pending)} processed in {elapsed:.2f} seconds, {len(text_tuples) - len(pending)} reused from cache\n"
+    if semantic_cache_error() is not None:
+        summary += f"⚠️ 의미 기반 캐시 비활성화: {semantic_cache_error()}\n"
+    if silent and log_fp:
+        log_fp.write(summary + '\n')
     elif not silent:
-        print(message)
-    return {
-        'file_path': file_path,
-        'foldername': foldername,
-        'filename': filename,
-        'description': description
-    }
-
-def process_text_files(text_tuples, text_inference, silent=False, log_file=None):
+        print(summary)
+
     results = []
-    for args in text_tuples:
-        data = process_single_text_file(args, text_inference, silent=silent, log_file=log_file)
-        results.append(data)
+    for file_path, _ in text_tuples:
+        foldername, filename, description = metadata[file_path]
+        message = f"File: {file_path}\nDescription: {description}\nFolder name: {foldername}\nGenerated filename: {filename}\n"
+        if silent and log_fp:
+            log_fp.write(message + '\n')
+        elif not silent:
+            print(message)
+        results.append({
+            'file_path': file_path,
+            'foldername': foldername,
+            'filename': filename,
+            'description': description
+        })
     return results
 
-def generate_text_metadata(text, file_path, progress, task_id, text_inference):
-    total_steps = 3
-    filename_ko = os.path.splitext(os.path.basename(file_path))[0]
-
-    # Step 1: 요약 생성
-    title_or_intro = extract_title_or_intro(text)  # 핵심만 추출
-    description = summarize_text_content(title_or_intro, text_inference)
-    progress.update(task_id, advance=1 / total_steps)
-
-    # Step 2: 파일명 생성
-    filename_prompt = f"""
-다음 파일명을 참고하여 간결하고 명확한 한글 파일명을 만들어주세요. 
-3단어 이내로 구성하고, 일반적인 단어(문서, 파일 등)는 피해주세요.
-
-기존 파일명: {filename_ko}
-
-파일명:
+# ✅ 파일명 + 폴더명을 한 번의 호출로 받기 위한 JSON 응답 파싱
+_JSON_DECODER = json.JSONDecoder()
+_FILENAME_FIELD = re.compile(r'"?(?:filename|파일명)"?\s*[:：]\s*"?([^"\n,}]+)', re.IGNORECASE)
+_CATEGORY_FIELD = re.compile(r'"?(?:category|폴더명)"?\s*[:：]\s*"?([^"\n,}]+)', re.IGNORECASE)
+# 값 앞의 라벨("Filename:", "폴더명:" 등)과 마크다운 기호/줄바꿈을 한 번에 제거
+_JUNK = re.compile(r'(?:^(?:Filename|Category|파일명|폴더명)\s*[:：]\s*|[*`\n])', re.IGNORECASE)
+
+_LABEL_PREFIXES = ('filename', 'category', '파일명', '폴더명')
+
+def clean_llm_text(raw_text):
+    # 대부분의 응답은 이미 깨끗하므로, 제거할 기호나 라벨이 있을 때만 정규식을 돌린다
+    if any(c in raw_text for c in '*`\n') or raw_text.lower().startswith(_LABEL_PREFIXES):
+        raw_text = _JUNK.sub('', raw_text)
+    return raw_text.strip()
+
+def parse_metadata_response(raw_text):
+    """LLM 응답에서 (filename, category) 추출.
+    첫 '{' 부터 JSON 을 읽고, 실패하면 라벨(filename/파일명, category/폴더명)로 각 필드를 찾는다.
+    라벨도 없이 한 줄만 답했다면 그 줄을 category 로 본다."""
+    start = raw_text.find('{')
+    if start != -1:
+        try:
+            data, _ = _JSON_DECODER.raw_decode(raw_text, start)
+            if isinstance(data, dict):
+                return str(data.get('filename') or ''), str(data.get('category') or '')
+        except json.JSONDecodeError:
+            pass
+    filename_field = _FILENAME_FIELD.search(raw_text)
+    category_field = _CATEGORY_FIELD.search(raw_text)
+    if not filename_field and not category_field:
+        lines = [line.strip() for line in raw_text.strip().split('\n') if line.strip()]
+        return '', lines[0] if len(lines) == 1 else ''
+    return (filename_field.group(1).strip() if filename_field else '',
+            category_field.group(1).strip() if category_field else '')
+
+# 고정 지시문은 항상 같은 바이트로 앞에 두고 파일별 내용은 맨 뒤에 둔다 (프롬프트 앞부분 KV 캐시 재사용)
+METADATA_PROMPT_HEADER = """
+다음 파일명과 문서 요약을 참고하여 새 파일명과 문서가 들어갈 주제 폴더명을 정해주세요.
+- filename: 간결하고 명확한 한글 파일명. 3단어 이내로 구성하고, 일반적인 단어(문서, 파일 등)는 피해주세요.
+- category: ❗ 반드시 2단어 이내의 한국어 '주제명' (예: 데이터 정규화, 자기 개발, 알고리즘 등). 문장이나 설명을 쓰지 마세요.
+출력은 JSON 한 줄만: {"filename": "...", "category": "..."}
+
+---
 """
-    filename_response = text_inference.create_completion(filename_prompt)
-    raw_filename = filename_response['choices'][0]['text'].strip()
-    filename = sanitize_filename(raw_filename, max_words=3)
-    progress.update(task_id, advance=1 / total_steps)
 
-    # Step 3: 폴더명 생성
-    folder_prompt = f"""
-다음 파일명과 문서 요약을 참고하여 해당 문서가 들어갈 주제 폴더명을 정해주세요.
-❗ 폴더명은 반드시 2단어 이내의 한국어 '주제명'이어야 하며, 문장이나 설명을 쓰지 마세요.
+# 끝에 고정된 답변 유도 문구를 붙여 모델이 요약을 이어 쓰지 않고 JSON 을 출력하게 한다
+METADATA_PROMPT_SUFFIX = "\nJSON:"
 
-파일명: {filename_ko}
+def build_metadata_prompt(filename_ko, description):
+    return METADATA_PROMPT_HEADER + f"""파일명: {filename_ko}
 요약: {description}
-
-주제 폴더명 (예: 데이터 정규화, 자기 개발, 알고리즘 등):
-"""
-    folder_response = text_inference.create_completion(folder_prompt)
-    raw_folder = folder_response['choices'][0]['text'].strip()
-    foldername = sanitize_filename(raw_folder, max_words=2)
-    progress.update(task_id, advance=1 / total_steps)
-
+""" + METADATA_PROMPT_SUFFIX
+
+def extract_metadata(raw_text, filename_ko):
+    """LLM 응답 → 정제된 (foldername, filename)"""
+    raw_filename, raw_folder = parse_metadata_response(raw_text)
+    filename = clean_llm_text(raw_filename)
+    filename = sanitize_filename(filename, max_words=3) if filename else filename_ko
+    # 폴더명을 얻지 못했으면 sanitize_filename 의 '분류안됨' 대신 '기타'로 보낸다
+    category = clean_llm_text(raw_folder) or '기타'
+    foldername = sanitize_filename(category, max_words=2)
     if not foldername or len(foldername) < 2 or len(foldername) > 20:
         foldername = '기타'
+    return foldername, filename
 
-    return foldername, filename or filename_ko, description
+# 파일 메타데이터 캐시 버전: 프롬프트가 바뀌면 자동으로, 파싱/정제 로직을 바꾸면 METADATA_PARSER_VERSION 을 올린다
+METADATA_PARSER_VERSION = 2
+METADATA_CACHE_VERSION = hashlib.sha256(
+    f"{SUMMARY_PROMPT_HEADER}{METADATA_PROMPT_HEADER}{METADATA_PROMPT_SUFFIX}{METADATA_PARSER_VERSION}".encode('utf-8')
+).hexdigest()